@@ -1,13 +1,230 @@
-from .providers.upstox import UpstoxProvider
-from .providers.mock import MockProvider
-from .providers.kotak import KotakProvider
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .providers.base import MarketDataProvider
+
+logger = logging.getLogger("TickHub")
+
+# Provider modules are imported inside their factory so a process only pays
+# for the broker it actually uses (kotak pulls in httpx + pyotp).
+
+def _make_upstox(config: dict):
+    from .providers.upstox import UpstoxProvider
+    creds = config.get("upstox_creds", {})
+    return UpstoxProvider(creds.get("api_key"), creds.get("token"))
+
+def _make_kotak(config: dict):
+    from .providers.kotak import KotakProvider
+    return KotakProvider(api_key=config.get("kotak_access_token"))
+
+def _make_mock(config: dict):
+    from .providers.mock import MockProvider
+    return MockProvider(csv_path="data/history.csv")
+
+# active_provider -> factory(config)
+_FACTORIES = {
+    "upstox": _make_upstox,
+    "kotak": _make_kotak,
+    "mock": _make_mock,
+}
 
 def get_provider(config: dict):
     mode = config.get("active_provider")
-    if mode == "upstox":
-        return UpstoxProvider(config.get("upstox_creds", {}).get("api_key"), config.get("upstox_creds", {}).get("token"))
-    elif mode == "kotak":
-        return KotakProvider(api_key=config.get("kotak_access_token"))
-    elif mode == "mock":
-        return MockProvider(csv_path="data/history.csv")
-    raise ValueError(f"Unknown provider: {mode}")
+    factory = _FACTORIES.get(mode)
+    if factory is None:
+        raise ValueError(f"Unknown provider: {mode}")
+    return factory(config)
+
+class TickFrame:
+    """
+    A tick as fanned out by the hub. Sessions that send the same encoding share
+    a single encode per tick instead of each re-serializing it.
+    """
+    __slots__ = ("tick", "_encoded")
+
+    def __init__(self, tick):
+        self.tick = tick
+        self._encoded = {}
+
+    def encoded(self, encoder):
+        data = self._encoded.get(encoder)
+        if data is None:
+            data = self._encoded[encoder] = encoder(self.tick)
+        return data
+
+class TickQueue(asyncio.Queue):
+    """
+    Bounded per-session queue of tick batches (one item per upstream batch, so
+    a large poll never overflows an idle session). A session that can't keep
+    up loses its oldest batches instead of stalling the producer or growing
+    without bound; dropped counts the ticks in them.
+    """
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def push(self, item):
+        if self.full():
+            oldest = self.get_nowait()
+            if oldest is not None:
+                self.dropped += len(oldest)
+        self.put_nowait(item)
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+class TickHub:
+    """
+    Owns the single upstream provider connection for the process and routes its
+    ticks to the streaming sessions. The provider is subscribed to the union of
+    all sessions' symbols; each tick only goes to the sessions that subscribed
+    to its symbol.
+    """
+    # Snapshots are reused for this long across sessions filtering the same symbols
+    SNAPSHOT_TTL = 1.0
+    SNAPSHOT_CACHE_MAX = 1024
+
+    def __init__(self, provider: MarketDataProvider, max_pending: int = 128):
+        self.provider = provider
+        # Upstream batches buffered per session before the oldest are dropped
+        self.max_pending = max_pending
+        self._snapshots: Dict[Tuple[str, ...], Tuple[float, Dict[str, Dict[str, Any]]]] = {}
+        self._queues: Set[TickQueue] = set()
+        self._subscriptions: Dict["HubSession", List[str]] = {}
+        # symbol -> queues of the streaming sessions subscribed to it
+        self._routes: Dict[str, List[TickQueue]] = {}
+        self._sub_lock = asyncio.Lock()
+        self._pump_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.provider.connect()
+
+    async def close(self):
+        if self._pump_task:
+            self._pump_task.cancel()
+        await self.provider.close()
+
+    def session(self) -> "HubSession":
+        return HubSession(self)
+
+    async def snapshot(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        key = tuple(symbols)
+        now = time.monotonic()
+        cached = self._snapshots.get(key)
+        if cached is not None and now - cached[0] < self.SNAPSHOT_TTL:
+            return cached[1]
+        snap = await self.provider.snapshot(symbols)
+        if len(self._snapshots) >= self.SNAPSHOT_CACHE_MAX:
+            self._snapshots.clear()
+        self._snapshots[key] = (now, snap)
+        return snap
+
+    def _rebuild_routes(self):
+        routes: Dict[str, List[TickQueue]] = {}
+        for session, symbols in self._subscriptions.items():
+            queue = session._queue
+            if queue is None or queue not in self._queues:
+                continue
+            for symbol in set(symbols):
+                routes.setdefault(symbol, []).append(queue)
+        self._routes = routes
+
+    def _attach(self, queue: TickQueue):
+        self._queues.add(queue)
+        self._rebuild_routes()
+        # (Re)start the upstream stream on demand so a provider error does not
+        # leave later sessions without ticks.
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+
+    def _detach(self, queue: TickQueue):
+        self._queues.discard(queue)
+        self._rebuild_routes()
+
+    async def _pump(self):
+        try:
+            async for ticks in self.provider.stream_batches():
+                routes = self._routes
+                # Each session gets one queue item per upstream batch
+                batches: Dict[TickQueue, List[TickFrame]] = {}
+                for tick in ticks:
+                    queues = routes.get(tick.symbol)
+                    if not queues:
+                        continue
+                    frame = TickFrame(tick)
+                    for queue in queues:
+                        batch = batches.get(queue)
+                        if batch is None:
+                            batches[queue] = [frame]
+                        else:
+                            batch.append(frame)
+                for queue, batch in batches.items():
+                    queue.push(batch)
+        except Exception:
+            logger.exception("Tick stream error")
+        finally:
+            # Wake every session so its stream ends like a direct provider stream would
+            for queue in self._queues:
+                queue.push(None)
+
+    async def _set_symbols(self, session: "HubSession", symbols: Optional[List[str]]):
+        async with self._sub_lock:
+            if symbols is None:
+                self._subscriptions.pop(session, None)
+            else:
+                self._subscriptions[session] = list(symbols)
+            self._rebuild_routes()
+            union = list(dict.fromkeys(s for syms in self._subscriptions.values() for s in syms))
+            await self.provider.set_subscriptions(union)
+
+class HubSession(MarketDataProvider):
+    """
+    Per-WebSocket view of a TickHub. Looks like a provider to the session code
+    (tick loops, UniverseManager) but shares the hub's upstream connection.
+    """
+    def __init__(self, hub: TickHub):
+        self.hub = hub
+        self._queue: Optional[TickQueue] = None
+
+    async def connect(self):
+        # The hub owns the upstream connection
+        pass
+
+    async def subscribe(self, symbols: list[str]):
+        await self.hub._set_symbols(self, symbols)
+
+    async def stream(self):
+        async for frame in self.frames():
+            yield frame.tick
+
+    async def frames(self):
+        """Yields the hub's shared TickFrames (tick + encode cache)."""
+        async for batch in self.batches():
+            for frame in batch:
+                yield frame
+
+    async def batches(self):
+        """Yields lists of TickFrames, one per upstream batch."""
+        queue = self._queue = TickQueue(self.hub.max_pending)
+        self.hub._attach(queue)
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            self.hub._detach(queue)
+
+    def take_dropped(self) -> int:
+        """Ticks dropped for this session since the last call."""
+        return self._queue.take_dropped() if self._queue else 0
+
+    async def snapshot(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        return await self.hub.snapshot(symbols)
+
+    async def close(self):
+        await self.hub._set_symbols(self, None)
@@ -1,52 +1,79 @@
 import csv
+import functools
 import os
 import logging
+import threading
 from pathlib import Path
 from typing import Dict, Optional
 
 logger = logging.getLogger("InstrumentMaster")
 
+# Relative csv paths resolve against the app root (apps/backend).
+# Assuming this code is in apps/backend/src, we go up one level
+_APP_ROOT = Path(__file__).resolve().parent.parent
+
 class InstrumentMaster:
     def __init__(self, csv_path: str = "data/instruments.csv"):
         self.csv_path = csv_path
         self._symbol_map: Dict[str, str] = {}
         self._loaded = False
+        self._load_lock = threading.Lock()
 
     def load(self):
         """Loads the CSV into memory."""
         if self._loaded:
             return
 
+        # Concurrent sessions can race into the first resolve(); let one thread
+        # parse the file while the others wait and then see _loaded.
+        with self._load_lock:
+            if self._loaded:
+                return
+            self._load_csv()
+
+    def _load_csv(self):
         path = Path(self.csv_path)
         if not path.is_absolute():
-            # Resolve relative to the app root (apps/backend)
-            # Assuming this code is in apps/backend/src, we go up one level
-            base_dir = Path(__file__).parent.parent
-            path = base_dir / self.csv_path
+            path = _APP_ROOT / path
 
-        if not path.exists():
+        # Open directly instead of stat-ing first with path.exists()
+        try:
+            f = open(path, mode='r', encoding='utf-8')
+        except FileNotFoundError:
             logger.warning(f"Instrument master not found at {path}")
             return
 
         try:
-            with open(path, mode='r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
+            with f:
+                reader = csv.reader(f)
+                # New Schema: symbol,exchange,series,isin,nse_scrip_code,bse_code
+                # Resolve column positions once rather than building a dict per row.
+                header = next(reader, [])
+                i_sym = header.index("symbol")
+                i_tok = header.index("nse_scrip_code")
+                i_exch = header.index("exchange") if "exchange" in header else None
+                width = max(i_sym, i_tok, -1 if i_exch is None else i_exch) + 1
+
+                # Every row shares one of a handful of exchanges, so build the
+                # "exchange_segment|" prefix once per exchange instead of per row.
+                prefix_cache: Dict[str, str] = {}
+                symbol_map = self._symbol_map
                 for row in reader:
-                    symbol = row.get("symbol", "").upper()
-                    
-                    # New Schema: symbol,exchange,series,isin,nse_scrip_code,bse_code
-                    token = row.get("nse_scrip_code")
-                    exchange = row.get("exchange", "NSE").lower()
-                    
-                    # Infer segment from series or default to cm
-                    # In new CSV, we are primarily dealing with Equity
-                    segment = "cm" 
-                    
+                    if len(row) < width:
+                        continue
+                    symbol = row[i_sym]
+                    token = row[i_tok]
+
                     if symbol and token:
+                        exchange = row[i_exch] if i_exch is not None else "NSE"
+                        prefix = prefix_cache.get(exchange)
+                        if prefix is None:
+                            # Infer segment from series or default to cm
+                            # In new CSV, we are primarily dealing with Equity
+                            prefix = prefix_cache[exchange] = exchange.lower() + "_cm|"
                         # Construct the canonical token ID used by Kotak Provider
                         # Format: "exchange_segment|token" e.g. "nse_cm|2885"
-                        canonical_id = f"{exchange}_{segment}|{token}"
-                        self._symbol_map[symbol] = canonical_id
+                        symbol_map[symbol.upper()] = prefix + token
             
             self._loaded = True
             logger.info(f"Instrument Master loaded {len(self._symbol_map)} symbols.")
@@ -60,4 +87,16 @@ class InstrumentMaster:
         """
         if not self._loaded:
             self.load()
-        return self._symbol_map.get(symbol.upper())
+        # Symbols almost always arrive upper-cased already; only fall back to
+        # upper() on a miss, and remember the alternate spelling when it hits.
+        token = self._symbol_map.get(symbol)
+        if token is None:
+            token = self._symbol_map.get(symbol.upper())
+            if token is not None:
+                self._symbol_map[symbol] = token
+        return token
+
+@functools.lru_cache(maxsize=1)
+def get_instrument_master() -> InstrumentMaster:
+    """Process-wide master for the default CSV, so it is parsed at most once."""
+    return InstrumentMaster()
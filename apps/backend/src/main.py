@@ -1,18 +1,73 @@
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from .data_orchestrator import get_provider
-from .paper_engine import PaperEngine
+from pydantic import BaseModel, ValidationError
+from pydantic_core import from_json, to_json
+import msgspec
+from .data_orchestrator import TickHub, TickQueue, get_provider
+from .providers.http_clients import aclose_shared_client
 from stockrhythm.models import Order as OrderModel, UniverseFilterSpec
 from .universe_manager import UniverseManager, UniverseResolver
 import asyncio
+import functools
+import logging
 import os
-import json
 from dotenv import load_dotenv
 
 # Load .env file from root or current dir
 load_dotenv()
 
-app = FastAPI()
-paper_engine = PaperEngine()
+logger = logging.getLogger("BackendAPI")
+
+# One upstream provider connection shared by every WebSocket session
+_hub: Optional[TickHub] = None
+_hub_lock = asyncio.Lock()
+
+async def _get_hub() -> TickHub:
+    global _hub
+    if _hub is None:
+        async with _hub_lock:
+            if _hub is None:
+                hub = TickHub(get_provider(CONFIG))
+                await hub.start()
+                _hub = hub
+    return _hub
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _hub
+    # Connect before accepting sessions; if that fails, the first session retries
+    try:
+        await _get_hub()
+    except Exception as e:
+        logger.warning("Provider connect failed at startup: %s", e)
+    # Parse the instrument master now so the first filtered session doesn't
+    # pay for it; off the loop since it is a blocking file read.
+    await asyncio.to_thread(get_universe_resolver)
+    yield
+    if _hub is not None:
+        await _hub.close()
+        # A later startup in the same process builds a fresh hub
+        _hub = None
+    # Providers share one HTTP client; close it once, after they are done
+    await aclose_shared_client()
+    # Only close the paper engine's SQLite connection if an order ever opened it
+    if get_paper_engine.cache_info().currsize:
+        await get_paper_engine().close()
+        get_paper_engine.cache_clear()
+
+app = FastAPI(lifespan=lifespan)
+
+@functools.lru_cache(maxsize=1)
+def get_paper_engine():
+    # Built on the first paper order; live and data-only sessions never pay for it
+    from .paper_engine import PaperEngine
+    return PaperEngine()
+
+@functools.lru_cache(maxsize=1)
+def get_universe_resolver() -> UniverseResolver:
+    # Shared across sessions so the instrument master is parsed once per process
+    return UniverseResolver()
 
 # Dynamic Config
 CONFIG = {
@@ -20,120 +75,306 @@ CONFIG = {
     "kotak_access_token": os.getenv("KOTAK_ACCESS_TOKEN")
 }
 
+# Wire formats negotiated in configure: JSON text frames (default) or
+# MessagePack binary frames. Each maps to an encoder and the matching send.
+# JSON is serialized straight from the model in pydantic-core rather than
+# model_dump() -> dict -> json.dumps() walking it twice.
+
+def _encode_json(obj) -> str:
+    return to_json(obj).decode()
+
+def _msgpack_default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise NotImplementedError(f"Cannot encode {type(obj)!r} as msgpack")
+
+_MSGPACK_ENC = msgspec.msgpack.Encoder(enc_hook=_msgpack_default)
+_MSGPACK_DEC = msgspec.msgpack.Decoder()
+
+# Per-tick frame encoders. They are module-level functions so TickFrame can use
+# them as cache keys: every session on the same protocol + wire format shares
+# one encode of each tick.
+# Protocol V1: Raw Tick JSON
+# Protocol V2: Wrap in { action: "tick", data: ... }
+
+def _tick_v1_json(tick) -> str:
+    return to_json(tick).decode()
+
+# The V2 wrapper is constant, so it is pre-encoded and only the tick itself
+# is serialized per frame.
+_TICK_V2_JSON_PREFIX = '{"action":"tick","data":'
+
+def _tick_v2_json(tick) -> str:
+    return _TICK_V2_JSON_PREFIX + to_json(tick).decode() + "}"
+
+def _tick_v1_msgpack(tick) -> bytes:
+    return _MSGPACK_ENC.encode(tick)
+
+# fixmap(2) header + "action": "tick" + "data" key; the trailing nil placeholder
+# is sliced off so the encoded tick becomes the "data" value.
+_TICK_V2_MSGPACK_PREFIX = _MSGPACK_ENC.encode({"action": "tick", "data": None})[:-1]
+
+def _tick_v2_msgpack(tick) -> bytes:
+    return _TICK_V2_MSGPACK_PREFIX + _MSGPACK_ENC.encode(tick)
+
+_TICK_ENCODERS = {
+    (1, "json"): _tick_v1_json,
+    (2, "json"): _tick_v2_json,
+    (1, "msgpack"): _tick_v1_msgpack,
+    (2, "msgpack"): _tick_v2_msgpack,
+}
+
+# Protocol V3 batches are stitched from each tick's cached V1 encoding, so a
+# tick is serialized once no matter how many sessions batch it.
+
+_TICK_BATCH_JSON_PREFIX = '{"action":"tick_batch","data":['
+
+def _tick_batch_json(frames) -> str:
+    return _TICK_BATCH_JSON_PREFIX + ",".join([f.encoded(_tick_v1_json) for f in frames]) + "]}"
+
+def _tick_batch_msgpack(frames) -> bytes:
+    data = [msgspec.Raw(f.encoded(_tick_v1_msgpack)) for f in frames]
+    return _MSGPACK_ENC.encode({"action": "tick_batch", "data": data})
+
+_TICK_BATCH_ENCODERS = {
+    "json": _tick_batch_json,
+    "msgpack": _tick_batch_msgpack,
+}
+
+# Protocol is fixed once the stream starts, so the frame encoder is picked once
+# instead of re-checking protocol_version for every tick.
+
+async def _tick_loop(provider, send, encode_tick, encode=None):
+    # encode is None for V1, whose clients only understand bare ticks, so lag
+    # notices are skipped there.
+    try:
+        async for frame in provider.frames():
+            await send(frame.encoded(encode_tick))
+            if encode is not None:
+                dropped = provider.take_dropped()
+                if dropped:
+                    await send(encode({"action": "lag", "dropped": dropped}))
+    except Exception:
+        logger.exception("Tick stream error")
+
+# Protocol V3 batching: flush after TICK_BATCH_MAX ticks or TICK_BATCH_WINDOW
+# seconds after the first tick of a batch, whichever comes first.
+TICK_BATCH_MAX = 64
+TICK_BATCH_WINDOW = 0.01
+# Upstream tick batches buffered for a slow V3 client before the oldest are dropped
+TICK_QUEUE_MAX = 128
+
+async def _tick_loop_v3(provider, send, encode_batch, encode):
+    # Protocol V3: { action: "tick_batch", data: [tick, ...] }
+    # One frame per burst instead of one frame (and event-loop hop) per tick.
+    queue = TickQueue(TICK_QUEUE_MAX)
+
+    async def pump():
+        try:
+            async for batch in provider.batches():
+                queue.push(batch)
+        except Exception:
+            logger.exception("Tick stream error")
+        finally:
+            queue.push(None)
+
+    pump_task = asyncio.create_task(pump())
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            frames = await queue.get()
+            if frames is None:
+                return
+            batch = list(frames)
+            deadline = loop.time() + TICK_BATCH_WINDOW
+            while len(batch) < TICK_BATCH_MAX:
+                if queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        frames = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    frames = queue.get_nowait()
+                if frames is None:
+                    queue.put_nowait(None)
+                    break
+                batch.extend(frames)
+            # A single upstream batch can exceed TICK_BATCH_MAX
+            for i in range(0, len(batch), TICK_BATCH_MAX):
+                await send(encode_batch(batch[i:i + TICK_BATCH_MAX]))
+            dropped = queue.take_dropped()
+            if dropped:
+                await send(encode({"action": "lag", "dropped": dropped}))
+    except Exception:
+        logger.exception("Tick stream error")
+    finally:
+        pump_task.cancel()
+
+async def _iter_frames(websocket: WebSocket):
+    # Like websocket.iter_text(), but also accepts binary frames so clients can
+    # send UTF-8 JSON bytes; pydantic-core parses either without a decode pass.
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        raw = message.get("text")
+        if raw is None:
+            raw = message.get("bytes")
+        if raw is not None:
+            yield raw
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+class _Session:
+    """Per-WebSocket state shared by the action handlers."""
+    def __init__(self, websocket: WebSocket, provider):
+        self.websocket = websocket
+        self.provider = provider
+        self.is_paper_trading = True # Default
+        self.protocol_version = 1
+        self.universe_task: Optional[asyncio.Task] = None
+        self.tick_task: Optional[asyncio.Task] = None
+        self.set_wire_format("json")
+
+    def set_wire_format(self, wire_format: str):
+        self.wire_format = "msgpack" if wire_format == "msgpack" else "json"
+        if self.wire_format == "msgpack":
+            self.encode, self.send_frame = _MSGPACK_ENC.encode, self.websocket.send_bytes
+        else:
+            self.encode, self.send_frame = _encode_json, self.websocket.send_text
+
+    async def send_json(self, obj: dict):
+        # Helper to send protocol messages in the negotiated wire format
+        await self.send_frame(self.encode(obj))
+
+def _payload(message: dict) -> Optional[dict]:
+    # V2+ messages nest their fields under "data"; V1 sent them at top level
+    data = message.get("data")
+    return data if isinstance(data, dict) else None
+
+async def _handle_configure(message: dict, session: _Session):
+    # Legacy/V1 support where top-level keys were used directly in configure
+    config_data = _payload(message)
+    if config_data is not None:
+        # V2 structure
+        session.protocol_version = config_data.get("protocol_version", 1)
+        session.is_paper_trading = config_data.get("paper_trade", True)
+        subscribe_symbols = config_data.get("subscribe")
+        filter_payload = config_data.get("filter")
+        session.set_wire_format(config_data.get("wire_format", "json"))
+    else:
+        # V1 structure
+        config_data = message
+        session.protocol_version = 1
+        session.is_paper_trading = config_data.get("paper_trade", True)
+        subscribe_symbols = config_data.get("subscribe")
+        filter_payload = None
+
+    protocol_version = session.protocol_version
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Session Configured: Protocol=%s, Paper=%s", protocol_version, session.is_paper_trading)
+
+    if filter_payload:
+        spec = UniverseFilterSpec.model_validate(filter_payload)
+        resolver = get_universe_resolver()
+        manager = UniverseManager(spec=spec, provider=session.provider, resolver=resolver, send_json=session.send_json)
+        # Stop existing if any
+        if session.universe_task:
+            session.universe_task.cancel()
+        session.universe_task = asyncio.create_task(manager.run())
+    elif subscribe_symbols:
+        await session.provider.set_subscriptions(subscribe_symbols)
+        if protocol_version >= 2:
+            # Send initial universe snapshot for static subscribe
+            await session.send_json({
+                "action": "universe", 
+                "data": {
+                    "added": subscribe_symbols, 
+                    "removed": [], 
+                    "universe": subscribe_symbols, 
+                    "reason": "static_subscribe"
+                }
+            })
+
+    # Start tick stream if not running
+    if not session.tick_task:
+        if protocol_version >= 3:
+            tick_coro = _tick_loop_v3(
+                session.provider, session.send_frame, _TICK_BATCH_ENCODERS[session.wire_format], session.encode
+            )
+        elif protocol_version >= 2:
+            encode_tick = _TICK_ENCODERS[(2, session.wire_format)]
+            tick_coro = _tick_loop(session.provider, session.send_frame, encode_tick, session.encode)
+        else:
+            encode_tick = _TICK_ENCODERS[(1, session.wire_format)]
+            tick_coro = _tick_loop(session.provider, session.send_frame, encode_tick)
+        session.tick_task = asyncio.create_task(tick_coro)
+
+async def _handle_order(message: dict, session: _Session):
+    # Handle both V1 (flat) and V2 (nested data)
+    order_data = _payload(message)
+
+    if not order_data and "symbol" in message: 
+         # fallback to flat message if 'data' key missing but fields present
+         order_data = message
+    
+    if order_data:
+        # Orders come from the client, so they are always validated; a bad one
+        # is reported back rather than tearing down the session.
+        try:
+            order = OrderModel.model_validate(order_data)
+        except ValidationError as e:
+            logger.warning("Rejected order: %s", e)
+            if session.protocol_version >= 2:
+                await session.send_json({"action": "error", "data": {"message": f"Invalid order: {e}"}})
+            return
+        if session.is_paper_trading:
+            await get_paper_engine().execute_order(order)
+        else:
+            logger.warning("LIVE TRADING NOT IMPLEMENTED YET FOR %s", order.symbol)
+
+# action -> handler(message, session)
+_HANDLERS = {
+    "configure": _handle_configure,
+    "order": _handle_order,
+}
+
 @app.websocket("/")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    provider = get_provider(CONFIG)
+    provider = (await _get_hub()).session()
     await provider.connect()
-    
-    is_paper_trading = True # Default
-    protocol_version = 1
-    universe_task = None
-    tick_task = None
-
-    async def send_json(obj: dict):
-        # Helper to send JSON messages
-        await websocket.send_text(json.dumps(obj))
-
-    async def tick_stream_loop():
-        try:
-            async for tick in provider.stream():
-                # Protocol V2: Wrap in { action: "tick", data: ... }
-                # Protocol V1: Raw Tick JSON
-                tick_dict = tick.model_dump(mode='json')
-                
-                if protocol_version >= 2:
-                    await send_json({"action": "tick", "data": tick_dict})
-                else:
-                    await websocket.send_json(tick_dict)
-        except Exception as e:
-            print(f"Tick Stream Error: {e}")
+    session = _Session(websocket, provider)
 
     try:
-        async for raw_message in websocket.iter_text():
+        async for raw_message in _iter_frames(websocket):
+            # Text frames are always JSON; binary frames use the negotiated format
             try:
-                message = json.loads(raw_message)
-            except json.JSONDecodeError:
+                if session.wire_format == "msgpack" and isinstance(raw_message, bytes):
+                    message = _MSGPACK_DEC.decode(raw_message)
+                else:
+                    message = from_json(raw_message)
+            except (ValueError, msgspec.DecodeError):
+                continue
+            if not isinstance(message, dict):
                 continue
 
-            action = message.get("action")
-            data = message.get("data", {}) # Protocol V2 wraps content in 'data'
-            
-            # Legacy/V1 support where top-level keys were used directly in configure
-            if action == "configure":
-                # Check structure
-                if "data" in message and isinstance(message["data"], dict):
-                    # V2 structure
-                    config_data = message["data"]
-                    protocol_version = config_data.get("protocol_version", 1)
-                    is_paper_trading = config_data.get("paper_trade", True)
-                    subscribe_symbols = config_data.get("subscribe")
-                    filter_payload = config_data.get("filter")
-                else:
-                    # V1 structure
-                    config_data = message
-                    protocol_version = 1
-                    is_paper_trading = config_data.get("paper_trade", True)
-                    subscribe_symbols = config_data.get("subscribe")
-                    filter_payload = None
-
-                print(f"Session Configured: Protocol={protocol_version}, Paper={is_paper_trading}")
-
-                if filter_payload:
-                    spec = UniverseFilterSpec(**filter_payload)
-                    resolver = UniverseResolver()
-                    manager = UniverseManager(spec=spec, provider=provider, resolver=resolver, send_json=send_json)
-                    # Stop existing if any
-                    if universe_task:
-                        universe_task.cancel()
-                    universe_task = asyncio.create_task(manager.run())
-                elif subscribe_symbols:
-                    await provider.set_subscriptions(subscribe_symbols)
-                    if protocol_version >= 2:
-                        # Send initial universe snapshot for static subscribe
-                        await send_json({
-                            "action": "universe", 
-                            "data": {
-                                "added": subscribe_symbols, 
-                                "removed": [], 
-                                "universe": subscribe_symbols, 
-                                "reason": "static_subscribe"
-                            }
-                        })
-
-                # Start tick stream if not running
-                if not tick_task:
-                    tick_task = asyncio.create_task(tick_stream_loop())
-            
-            elif action == "order":
-                # Handle both V1 (flat) and V2 (nested data)
-                if "data" in message and isinstance(message["data"], dict):
-                    order_data = message["data"]
-                else:
-                    order_data = message.get("data") # fallback if mixed
-
-                if not order_data and "symbol" in message: 
-                     # fallback to flat message if 'data' key missing but fields present
-                     order_data = message
-                
-                if order_data:
-                    order = OrderModel(**order_data)
-                    if is_paper_trading:
-                        await paper_engine.execute_order(order)
-                    else:
-                        print(f"LIVE TRADING NOT IMPLEMENTED YET FOR {order.symbol}")
+            handler = _HANDLERS.get(message.get("action"))
+            if handler:
+                await handler(message, session)
 
     except WebSocketDisconnect:
-        print("Client disconnected")
+        logger.debug("Client disconnected")
     except Exception as e:
-        print(f"Message Loop Error: {e}")
+        logger.error("Message Loop Error: %s", e)
     finally:
-        if universe_task:
-            universe_task.cancel()
-        if tick_task:
-            tick_task.cancel()
-
+        if session.universe_task:
+            session.universe_task.cancel()
+        if session.tick_task:
+            session.tick_task.cancel()
+        await provider.close()
@@ -1,18 +1,38 @@
+import asyncio
+import logging
 import sqlite3
 from datetime import datetime
+from typing import List, Optional
 from stockrhythm.models import Order
 import os
 
 DB_PATH = "paper_trades.db"
 
+logger = logging.getLogger("PaperEngine")
+
 class PaperEngine:
+    INSERT_ORDER = "INSERT INTO orders (symbol, qty, side, type, limit_price, status, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    INSERT_TRADE = "INSERT INTO trades (order_id, symbol, qty, price, timestamp) VALUES (?, ?, ?, ?, ?)"
+
+    # Max orders folded into one transaction by the writer
+    MAX_BATCH = 256
+
     def __init__(self):
+        # One long-lived connection in autocommit mode; transactions are explicit.
+        # WAL + synchronous=NORMAL keeps a commit to a single WAL append.
+        self._conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        # Orders are queued to a single writer task that group-commits them
+        self._write_q: asyncio.Queue = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
+        self._closed = False
         self._init_db()
 
     def _init_db(self):
         """Creates the SQLite database and tables if they don't exist."""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
         
         # Orders Table
         cursor.execute("""
@@ -40,33 +60,91 @@ class PaperEngine:
                 FOREIGN KEY(order_id) REFERENCES orders(id)
             )
         """)
-        conn.commit()
-        conn.close()
+
+    async def close(self):
+        if self._closed:
+            return
+        # Set first so no order can queue behind the writer's stop sentinel
+        self._closed = True
+        # Let the writer flush whatever is queued before the connection goes away
+        if self._writer_task is not None:
+            self._write_q.put_nowait(None)
+            await self._writer_task
+        self._conn.close()
+
+    def _write_orders(self, orders: List[Order]) -> List[int]:
+        conn = self._conn
+        # One timestamp per batch, pre-formatted exactly like sqlite3's default
+        # datetime adapter (deprecated in 3.12) so stored rows are unchanged.
+        now = datetime.now().isoformat(" ")
+        order_ids = []
+        # Every queued order + its fill commit together in one transaction
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for order in orders:
+                # 1. Insert Order
+                cursor = conn.execute(
+                    self.INSERT_ORDER,
+                    (order.symbol, order.qty, order.side, order.type, order.limit_price, "FILLED", now)
+                )
+                order_id = cursor.lastrowid
+
+                # 2. Simulate immediate Fill (Paper trading simplification)
+                # Note: In a real simulation, we would wait for a tick price.
+                # Here we just record it.
+                conn.execute(
+                    self.INSERT_TRADE,
+                    (order_id, order.symbol, order.qty, order.limit_price or 0.0, now)
+                )
+                order_ids.append(order_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return order_ids
+
+    async def _drain(self):
+        queue = self._write_q
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # Fold in whatever else queued up while the last commit was running
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    queue.put_nowait(None)
+                    break
+                batch.append(item)
+
+            try:
+                # The commit blocks on disk, so keep it off the event loop
+                order_ids = await asyncio.to_thread(self._write_orders, [order for order, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), order_id in zip(batch, order_ids):
+                if not fut.done():
+                    fut.set_result(order_id)
 
     async def execute_order(self, order: Order) -> dict:
         """
         Simulates an order execution and saves to SQLite.
         """
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # 1. Insert Order
-        cursor.execute(
-            "INSERT INTO orders (symbol, qty, side, type, limit_price, status, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (order.symbol, order.qty, order.side, order.type, order.limit_price, "FILLED", datetime.now())
-        )
-        order_id = cursor.lastrowid
-        
-        # 2. Simulate immediate Fill (Paper trading simplification)
-        # Note: In a real simulation, we would wait for a tick price.
-        # Here we just record it.
-        cursor.execute(
-            "INSERT INTO trades (order_id, symbol, qty, price, timestamp) VALUES (?, ?, ?, ?, ?)",
-            (order_id, order.symbol, order.qty, order.limit_price or 0.0, datetime.now())
-        )
-        
-        conn.commit()
-        conn.close()
+        if self._closed:
+            # The writer is gone; queuing would leave the caller waiting forever
+            raise RuntimeError("PaperEngine is closed")
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._drain())
+        fut = asyncio.get_running_loop().create_future()
+        self._write_q.put_nowait((order, fut))
+        order_id = await fut
         
-        print(f"[PaperEngine] Recorded Order #{order_id} for {order.symbol} in SQLite")
+        logger.debug("Recorded Order #%d for %s in SQLite", order_id, order.symbol)
         return {"status": "success", "order_id": order_id}
@@ -3,6 +3,9 @@ from typing import AsyncIterable, List, Dict, Any
 from stockrhythm.models import Tick
 
 class MarketDataProvider(ABC):
+    # Empty so providers that declare __slots__ get no per-instance __dict__
+    __slots__ = ()
+
     @abstractmethod
     async def connect(self): 
         """Perform Authentication and WebSocket Handshake"""
@@ -18,9 +21,20 @@ class MarketDataProvider(ABC):
         """
         Yields normalized Tick objects.
         Crucial: Must convert Vendor-Specific JSON to StockRhythm 'Tick' model.
+        Tick.symbol must be the symbol as passed to subscribe(); the TickHub
+        routes ticks to sessions by it.
         """
         pass
 
+    # ---- OPTIONAL: ticks grouped per upstream message (default wraps stream) ----
+    async def stream_batches(self) -> AsyncIterable[List[Tick]]:
+        """
+        Yields lists of Ticks that arrived together (e.g. one poll response),
+        so consumers pay one await per batch instead of one per tick.
+        """
+        async for tick in self.stream():
+            yield [tick]
+
     # ---- NEW: full replace subscription (default calls subscribe) ----
     async def set_subscriptions(self, symbols: List[str]):
         await self.subscribe(symbols)
@@ -33,3 +47,7 @@ class MarketDataProvider(ABC):
         Not required for all providers, but needed for dynamic filters.
         """
         raise NotImplementedError
+
+    # ---- OPTIONAL: release network resources on shutdown ----
+    async def close(self):
+        pass
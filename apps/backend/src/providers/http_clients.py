@@ -0,0 +1,30 @@
+from typing import TYPE_CHECKING, Optional
+
+# httpx is imported on first use so processes on the mock provider (and the
+# app's shutdown path) don't pay for it.
+if TYPE_CHECKING:
+    import httpx
+
+# One pooled HTTP/2 client per process: every provider's logins and quote
+# polls reuse a warm connection instead of paying a TCP+TLS handshake on a
+# cold per-instance pool. Providers fetch it per use rather than keeping a
+# reference; the app closes it once on shutdown.
+_SHARED_CLIENT: Optional["httpx.AsyncClient"] = None
+
+def get_shared_client() -> "httpx.AsyncClient":
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is None or _SHARED_CLIENT.is_closed:
+        import httpx
+        _SHARED_CLIENT = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=85),
+            timeout=httpx.Timeout(10.0, connect=3.0),
+        )
+    return _SHARED_CLIENT
+
+async def aclose_shared_client():
+    """Closes the process-wide HTTP client; the next get_shared_client() opens a new one."""
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is not None:
+        await _SHARED_CLIENT.aclose()
+        _SHARED_CLIENT = None
@@ -1,15 +1,48 @@
 from .base import MarketDataProvider
+from .http_clients import get_shared_client
 from stockrhythm.models import Tick
 from datetime import datetime
 import os
-import httpx
 import pyotp
+from pydantic_core import from_json
 import asyncio
 import logging
+import random
+import time
+from operator import itemgetter
 
 logger = logging.getLogger("KotakProvider")
 
+# Quote polling: poll fast while prices move, back off through these delays as
+# consecutive polls come back unchanged (API budget is 10 req/s).
+_POLL_ACTIVE_DELAY = 0.1
+_POLL_DELAYS = (0.2, 0.2, 0.5, 0.5, 1.0)
+_QUOTE_RATE_LIMIT = 10  # requests per second
+# Exponential back-off after 429/5xx/transport errors: base * 2**failures, capped
+_BACKOFF_BASE = 0.5
+_BACKOFF_MAX = 60.0
+# Random extra delay (seconds) so reconnecting processes don't poll in lockstep
+_BACKOFF_JITTER = 0.25
+# Consecutive failed polls before the outage is logged as an error
+_FAIL_ALERT_AFTER = 5
+# Symbols per quote request
+_QUOTE_SHARD_SIZE = 50
+
 class KotakProvider(MarketDataProvider):
+    # Fetches every quote field the stream needs in one C-level call
+    _QUOTE_FIELDS = itemgetter("ltp", "last_volume", "display_symbol", "exchange_token")
+    # Quote 401s force at most one fresh login per this many seconds
+    SESSION_TTL = 3600
+
+    # Fixed attribute set: the poll loop reads these on every iteration
+    __slots__ = (
+        "access_token", "mobile", "ucc", "mpin", "totp_secret", "_totp",
+        "_login_headers", "_quote_headers",
+        "session_token", "session_sid", "_relogin_at", "base_url",
+        "_query_string", "_quote_url_tails", "_symbol_ids",
+        "_last_ltps", "_idle_count", "_fail_ct",
+    )
+
     def __init__(self, api_key: str):
         # API Key is the "Access Token" from NEO Dashboard
         self.access_token = api_key.strip() if api_key else ""
@@ -28,12 +61,35 @@ class KotakProvider(MarketDataProvider):
         if not all([self.mobile, self.ucc, self.mpin, self.totp_secret]):
             logger.warning("Missing Kotak Credentials in Environment (KOTAK_MOBILE, KOTAK_UCC, KOTAK_MPIN, KOTAK_TOTP_SECRET)")
 
-        self.client = httpx.AsyncClient(timeout=10.0)
+        # Built once; reconnects only compute the current code
+        self._totp = pyotp.TOTP(self.totp_secret) if self.totp_secret else None
+
+        # Static request headers, built once instead of per request
+        self._login_headers = {
+            "Authorization": self.access_token,
+            "neo-fin-key": "neotradeapi",
+            "Content-Type": "application/json"
+        }
+        self._quote_headers = {
+            "Authorization": self.access_token,
+            "Content-Type": "application/json"
+        }
         self.session_token = None
         self.session_sid = None
+        # Last login forced by a quote 401 (never yet)
+        self._relogin_at = float("-inf")
         self.base_url = "https://mis.kotaksecurities.com" # Default, updated after login
         
-        self.subscribed_symbols = []
+        # Built in subscribe(); the poll loop only prepends base_url
+        self._query_string = ""
+        self._quote_url_tails: list[str] = []
+        # Quote identifiers -> symbol as subscribed, so ticks carry the id the
+        # session asked for
+        self._symbol_ids: dict[str, str] = {}
+        self._last_ltps: dict[str, float] = {}
+        self._idle_count = 0
+        # Consecutive polls that were throttled or failed upstream
+        self._fail_ct = 0
 
     async def connect(self):
         """
@@ -45,46 +101,37 @@ class KotakProvider(MarketDataProvider):
         
         # Step 1: Login with TOTP
         try:
-            totp_now = pyotp.TOTP(self.totp_secret).now()
+            totp_now = self._totp.now()
         except Exception as e:
             raise ValueError(f"Failed to generate TOTP. Check KOTAK_TOTP_SECRET. Error: {e}")
 
         login_url = "https://mis.kotaksecurities.com/login/1.0/tradeApiLogin"
-        headers_step1 = {
-            "Authorization": self.access_token,
-            "neo-fin-key": "neotradeapi",
-            "Content-Type": "application/json"
-        }
         body_step1 = {
             "mobileNumber": self.mobile,
             "ucc": self.ucc,
             "totp": totp_now
         }
         
-        resp1 = await self.client.post(login_url, headers=headers_step1, json=body_step1)
+        # Fetched per use: the app owns the shared client and may have replaced it
+        client = get_shared_client()
+        resp1 = await client.post(login_url, headers=self._login_headers, json=body_step1)
         if resp1.status_code != 200:
             raise ConnectionError(f"Kotak Login Step 1 Failed: {resp1.text}")
             
-        data1 = resp1.json()["data"]
+        data1 = from_json(resp1.content)["data"]
         view_token = data1["token"]
         view_sid = data1["sid"]
         
         # Step 2: Validate MPIN
         validate_url = "https://mis.kotaksecurities.com/login/1.0/tradeApiValidate"
-        headers_step2 = {
-            "Authorization": self.access_token,
-            "neo-fin-key": "neotradeapi",
-            "sid": view_sid,
-            "Auth": view_token,
-            "Content-Type": "application/json"
-        }
+        headers_step2 = {**self._login_headers, "sid": view_sid, "Auth": view_token}
         body_step2 = {"mpin": self.mpin}
         
-        resp2 = await self.client.post(validate_url, headers=headers_step2, json=body_step2)
+        resp2 = await client.post(validate_url, headers=headers_step2, json=body_step2)
         if resp2.status_code != 200:
             raise ConnectionError(f"Kotak Login Step 2 Failed: {resp2.text}")
 
-        data2 = resp2.json()["data"]
+        data2 = from_json(resp2.content)["data"]
         
         # Store Session Credentials
         self.session_token = data2["token"]
@@ -100,80 +147,188 @@ class KotakProvider(MarketDataProvider):
         """
         # Ensure symbols are formatted correctly (e.g., "nse_cm|RELIANCE-EQ")
         # If user passes just "RELIANCE", we might default to "nse_cm|RELIANCE-EQ"
-        self.subscribed_symbols = symbols
+        # If it's a canonical token (has pipe) or user-constructed string, pass it;
+        # raw symbols without pipe fall back to the legacy construction
+        parts = [s if "|" in s else f"nse_cm|{s}-EQ" for s in symbols]
+        self._query_string = ",".join(parts)
+        # Quotes come back keyed by exchange segment + exchange_token (or by
+        # display_symbol for "<SYM>-EQ" lookups); map both to the subscribed id
+        symbol_ids = {}
+        for symbol, part in zip(symbols, parts):
+            symbol_ids[part] = symbol
+            symbol_ids.setdefault(part.partition("|")[2], symbol)
+        self._symbol_ids = symbol_ids
+        # Quotes API Endpoint
+        # GET <Base URL>/script-details/1.0/quotes/neosymbol/<query>[,<query>][/<filter_name>]
+        # We append '/all' filter as seen in documentation examples.
+        # Large universes are split into shards to keep URLs short.
+        self._quote_url_tails = [
+            f"/script-details/1.0/quotes/neosymbol/{','.join(parts[i:i + _QUOTE_SHARD_SIZE])}/all"
+            for i in range(0, len(parts), _QUOTE_SHARD_SIZE)
+        ]
         logger.info(f"Subscribed to: {symbols}")
+        logger.info(f"Looking up Kotak symbols: {self._query_string}")
 
     async def stream(self):
+        async for ticks in self.stream_batches():
+            for tick in ticks:
+                yield tick
+
+    async def stream_batches(self):
         """
-        Polls the Quotes API for all subscribed symbols.
+        Polls the Quotes API for all subscribed symbols; yields one list of
+        Ticks per poll.
         """
+        loop = asyncio.get_running_loop()
         while True:
-            if not self.subscribed_symbols:
+            if not self._query_string:
                 # Wait for symbols to be subscribed via the WebSocket 'configure' action
                 await asyncio.sleep(0.5)
                 continue
 
+            # Delays are measured from the start of the poll, so request time
+            # doesn't stretch the cadence
+            poll_start = loop.time()
             try:
-                # Construct Query
-                query_parts = []
-                for s in self.subscribed_symbols:
-                    # If it's a canonical token (has pipe) or user-constructed string, pass it
-                    if "|" in s:
-                        query_parts.append(s)
-                    # Fallback for raw symbols without pipe -> legacy construction
-                    else:
-                        query_parts.append(f"nse_cm|{s}-EQ")
-                
-                query_string = ",".join(query_parts)
-                
-                # Quotes API Endpoint
-                # GET <Base URL>/script-details/1.0/quotes/neosymbol/<query>[,<query>][/<filter_name>]
-                # We append '/all' filter as seen in documentation examples
-                quote_url = f"{self.base_url}/script-details/1.0/quotes/neosymbol/{query_string}/all"
-                
-                logger.info(f"Looking up Kotak symbols: {query_string}")
-                logger.debug(f"Polling Kotak Quotes: {quote_url}")
-                
-                headers = {
-                    "Authorization": self.access_token,
-                    "Content-Type": "application/json"
-                }
-                
-                resp = await self.client.get(quote_url, headers=headers)
-                
-                if resp.status_code == 200:
-                    data = resp.json()
-                    
-                    # Kotak returns a list of objects. If it returns a dict with 'stat': 'Not_Ok', handle it.
-                    if isinstance(data, dict) and data.get("stat") == "Not_Ok":
-                        logger.error(f"Kotak API Error: {data.get('emsg')}")
-                        continue
+                base_url = self.base_url
+                tails = self._quote_url_tails
+                client = get_shared_client()
+                logger.debug("Polling Kotak Quotes: %s shard(s) for %s", len(tails), self._query_string)
+
+                # Shards go out concurrently and multiplex over the shared client
+                responses = await asyncio.gather(
+                    *(client.get(base_url + tail, headers=self._quote_headers) for tail in tails),
+                    return_exceptions=True,
+                )
 
-                    if not isinstance(data, list):
-                        logger.error(f"Unexpected Kotak response format: {data}")
+                data = []
+                polled = False
+                unauthorized = False
+                failed = False
+                for resp in responses:
+                    if isinstance(resp, Exception):
+                        logger.error(f"Quote Poll Error: {resp}")
+                        failed = True
+                        continue
+                    if resp.status_code == 401:
+                        unauthorized = True
+                        failed = True
+                        continue
+                    if resp.status_code == 429 or resp.status_code >= 500:
+                        failed = True
+                    if resp.status_code != 200:
+                        logger.error(f"Quote Poll HTTP Error: {resp.status_code} - {resp.text}")
                         continue
 
-                    for item in data:
-                        if not isinstance(item, dict):
-                            continue
-                            
-                        # Extract fields safely
-                        price = float(item.get("ltp", 0.0))
-                        volume = float(item.get("last_volume", 0.0))
-                        symbol_name = item.get("display_symbol") or item.get("exchange_token")
-                        
-                        yield Tick(
-                            symbol=str(symbol_name),
-                            price=price,
-                            volume=volume,
-                            timestamp=datetime.now(),
-                            provider="kotak"
-                        )
+                    # Parse the raw body directly; resp.json() decodes to str first
+                    payload = from_json(resp.content)
+
+                    # Kotak returns a list of objects. If it returns a dict with 'stat': 'Not_Ok', handle it.
+                    if isinstance(payload, dict) and payload.get("stat") == "Not_Ok":
+                        logger.error(f"Kotak API Error: {payload.get('emsg')}")
+                    elif not isinstance(payload, list):
+                        logger.error(f"Unexpected Kotak response format: {payload}")
+                    else:
+                        data.extend(payload)
+                        polled = True
+
+                if unauthorized:
+                    # Quotes authenticate with the static access token, so a fresh
+                    # login may not help; try it at most once per SESSION_TTL and
+                    # otherwise just back off, to avoid tripping account lockout.
+                    now_mono = time.monotonic()
+                    if now_mono - self._relogin_at >= self.SESSION_TTL:
+                        logger.warning("Kotak quotes rejected (401), logging in again")
+                        self._relogin_at = now_mono
+                        self.session_token = None
+                        await self.connect()
+                    else:
+                        logger.warning("Kotak quotes still rejected (401), backing off")
+
+                # Errors fall through to the slowest poll delay
+                delay = self._next_delay(data) if polled else _POLL_DELAYS[-1]
+                # Every shard is a request against the rate limit
+                delay = max(delay, len(tails) / _QUOTE_RATE_LIMIT)
+                if failed:
+                    # Rate-limited or upstream trouble: back off instead of
+                    # hammering the endpoint at the normal cadence
+                    delay = max(delay, self._backoff_delay())
                 else:
-                    logger.error(f"Quote Poll HTTP Error: {resp.status_code} - {resp.text}")
+                    self._fail_ct = 0
+
+                # Every quote in a poll shares the fetch time
+                now = datetime.now()
+                symbol_ids = self._symbol_ids
+                batch = []
+                for item in data:
+                    # Quotes are nearly always well-formed dicts, so skip the
+                    # odd malformed entry on failure instead of type-checking each one
+                    try:
+                        try:
+                            ltp, last_volume, display_symbol, exchange_token = self._QUOTE_FIELDS(item)
+                        except KeyError:
+                            # Extract fields safely when a quote omits any of them
+                            ltp = item.get("ltp", 0.0)
+                            last_volume = item.get("last_volume", 0.0)
+                            display_symbol = item.get("display_symbol")
+                            exchange_token = item.get("exchange_token")
+                        # Kotak sends numbers as strings
+                        price = float(ltp)
+                        volume = float(last_volume)
+                        token = str(exchange_token)
+                        symbol_name = (
+                            symbol_ids.get(f"{item.get('exchange')}|{token}")
+                            or symbol_ids.get(token)
+                            or symbol_ids.get(display_symbol)
+                            or display_symbol or exchange_token
+                        )
+                    except (AttributeError, TypeError, ValueError):
+                        continue
+
+                    batch.append(Tick(
+                        symbol=str(symbol_name),
+                        price=price,
+                        volume=volume,
+                        timestamp=now,
+                        provider="kotak"
+                    ))
+                if batch:
+                    yield batch
 
             except Exception as e:
+                # e.g. a failed re-login; back off like any other failed poll
                 logger.error(f"Stream Loop Error: {e}")
+                delay = max(_POLL_DELAYS[-1], self._backoff_delay())
             
-            # Rate Limit Friendly (Doc says 10 req/s, we do 1s poll)
-            await asyncio.sleep(1)
+            # Rate Limit Friendly (Doc says 10 req/s)
+            await asyncio.sleep(max(0.0, poll_start + delay - loop.time()))
+
+    def _backoff_delay(self) -> float:
+        """Counts a failed poll and returns its jittered exponential back-off."""
+        self._fail_ct += 1
+        if self._fail_ct == 1:
+            logger.warning("Kotak quote poll failed, backing off")
+        elif self._fail_ct == _FAIL_ALERT_AFTER:
+            logger.error(f"Kotak quote polls failed {self._fail_ct} times in a row")
+        return min(_BACKOFF_MAX, _BACKOFF_BASE * 2 ** self._fail_ct) + random.random() * _BACKOFF_JITTER
+
+    def _next_delay(self, data: list) -> float:
+        """Picks the next poll delay: fast while any LTP changed, else back off."""
+        changed = False
+        last_ltps = self._last_ltps
+        for item in data:
+            try:
+                key = item.get("exchange_token") or item.get("display_symbol")
+                ltp = item.get("ltp")
+            except AttributeError:
+                continue
+            if last_ltps.get(key) != ltp:
+                last_ltps[key] = ltp
+                changed = True
+
+        if changed:
+            self._idle_count = 0
+            return _POLL_ACTIVE_DELAY
+        delay = _POLL_DELAYS[min(self._idle_count, len(_POLL_DELAYS) - 1)]
+        self._idle_count += 1
+        return delay
@@ -4,32 +4,44 @@ from datetime import datetime
 from typing import List, Dict, Any
 import asyncio
 import csv
+import logging
 from pathlib import Path
 
+logger = logging.getLogger("MockProvider")
+
 class MockProvider(MarketDataProvider):
+    __slots__ = ("csv_path", "symbols")
+
     def __init__(self, csv_path: str = "data/history.csv"):
         self.csv_path = csv_path
+        # Ticks TEST until subscribed. Behind the TickHub this default is never
+        # routed: a session that configures without subscribing gets no ticks.
+        self.symbols: List[str] = ["TEST"]
 
     async def connect(self):
-        print("MockProvider connected.")
+        logger.info("MockProvider connected.")
         
     async def subscribe(self, symbols: list[str]):
-        print(f"MockProvider subscribed to {symbols}")
+        logger.debug("MockProvider subscribed to %s", symbols)
+        self.symbols = list(symbols)
 
     async def stream(self):
+        async for ticks in self.stream_batches():
+            for tick in ticks:
+                yield tick
+
+    async def stream_batches(self):
         # Simulate streaming from CSV
         # In a real impl, we would read the CSV line by line with delays
-        print("MockProvider starting stream...")
+        logger.debug("MockProvider starting stream...")
         while True:
             await asyncio.sleep(0.1)
-            # Yield a dummy tick
-            yield Tick(
-                symbol="TEST",
-                price=99.0,
-                volume=10,
-                timestamp=datetime.now(),
-                provider="mock"
-            )
+            # Yield a dummy tick per subscribed symbol
+            now = datetime.now()
+            yield [
+                Tick(symbol=symbol, price=99.0, volume=10, timestamp=now, provider="mock")
+                for symbol in self.symbols
+            ]
 
     async def snapshot(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
         # Dummy snapshot for testing universe filters
@@ -1,13 +1,12 @@
 from stockrhythm.models import Order
 
+MAX_ORDER_SIZE = 1000
+
 def validate_order(order: Order, account_state: dict) -> bool:
-    # Rule 1: Buying Power Check
-    cost = order.qty * (order.limit_price if order.limit_price else 0) # simplified for market order
-    if cost > account_state['cash']:
-        return False
-    
-    # Rule 2: Max Order Size
-    if order.qty > 1000:
+    # Rule 1: Max Order Size (cheapest check first)
+    if order.qty > MAX_ORDER_SIZE:
         return False
-        
-    return True
+
+    # Rule 2: Buying Power Check
+    cost = order.qty * (order.limit_price or 0.0) # simplified for market order
+    return cost <= account_state['cash']
@@ -1,25 +1,38 @@
 from __future__ import annotations
 import asyncio
+import logging
+import operator
 import time
-from typing import List, Set, Optional
+from typing import Dict, List, Set, Optional
 
 from stockrhythm.models import UniverseFilterSpec, UniverseUpdate, FilterOp
 from .providers.base import MarketDataProvider
-from .instrument_master import InstrumentMaster
+from .instrument_master import InstrumentMaster, get_instrument_master
+
+logger = logging.getLogger("UniverseManager")
+
+def _between(value, target) -> bool:
+    lo, hi = target
+    return lo <= value <= hi
+
+# FilterOp -> predicate(value, target)
+_OPS = {
+    FilterOp.EQ: operator.eq,
+    FilterOp.NE: operator.ne,
+    FilterOp.GT: operator.gt,
+    FilterOp.GTE: operator.ge,
+    FilterOp.LT: operator.lt,
+    FilterOp.LTE: operator.le,
+    FilterOp.IN: lambda value, target: value in target,
+    FilterOp.NOT_IN: lambda value, target: value not in target,
+    FilterOp.BETWEEN: _between,
+}
+
+def _never(value, target) -> bool:
+    return False
 
 def _passes(value, op: FilterOp, target) -> bool:
-    if op == FilterOp.EQ: return value == target
-    if op == FilterOp.NE: return value != target
-    if op == FilterOp.GT: return value > target
-    if op == FilterOp.GTE: return value >= target
-    if op == FilterOp.LT: return value < target
-    if op == FilterOp.LTE: return value <= target
-    if op == FilterOp.IN: return value in target
-    if op == FilterOp.NOT_IN: return value not in target
-    if op == FilterOp.BETWEEN:
-        lo, hi = target
-        return lo <= value <= hi
-    return False
+    return _OPS.get(op, _never)(value, target)
 
 class UniverseResolver:
     """
@@ -28,10 +41,16 @@ class UniverseResolver:
       - instrument master resolver
       - watchlist passthrough
     """
+    # Resolved watchlist symbols kept across refreshes (cleared when full)
+    RESOLVE_CACHE_MAX = 4096
+
     def __init__(self, instrument_master: Optional[InstrumentMaster] = None):
-        self.master = instrument_master or InstrumentMaster()
+        # Resolvers built without a master share the process-wide one
+        self.master = instrument_master or get_instrument_master()
         # Ensure master is loaded
         self.master.load()
+        # Watchlist symbol -> token; only master hits, so a miss is retried
+        self._resolve_cache: Dict[str, str] = {}
 
     async def candidates(self, spec: UniverseFilterSpec) -> List[str]:
         c = spec.candidates or {}
@@ -39,16 +58,22 @@ class UniverseResolver:
 
         if t == "watchlist":
             raw_symbols = list(c.get("symbols", []))
+            cache = self._resolve_cache
             resolved_tokens = []
             for sym in raw_symbols:
-                # Try to map RELIANCE -> nse_cm|2885
-                token = self.master.resolve(sym)
-                if token:
-                    resolved_tokens.append(token)
-                else:
-                    # Fallback: if user passed a token directly or mapping missing
-                    print(f"Warning: Symbol {sym} not found in master, using as-is.")
-                    resolved_tokens.append(sym)
+                token = cache.get(sym)
+                if token is None:
+                    # Try to map RELIANCE -> nse_cm|2885
+                    token = self.master.resolve(sym)
+                    if token:
+                        if len(cache) >= self.RESOLVE_CACHE_MAX:
+                            cache.clear()
+                        cache[sym] = token
+                    else:
+                        # Fallback: if user passed a token directly or mapping missing
+                        logger.warning("Symbol %s not found in master, using as-is.", sym)
+                        token = sym
+                resolved_tokens.append(token)
             return resolved_tokens
 
         # Placeholder: you will implement real index/instrument_master sources
@@ -71,16 +96,19 @@ class UniverseResolver:
         try:
             snap = await provider.snapshot(base)
         except NotImplementedError:
-            print("Warning: Provider does not support snapshot(), skipping dynamic conditions.")
+            logger.warning("Provider does not support snapshot(), skipping dynamic conditions.")
             return base[: spec.max_symbols]
 
+        # Look up each condition's predicate once, not per symbol
+        compiled = [(cond.field, _OPS.get(cond.op, _never), cond.value) for cond in spec.conditions]
+
         selected: List[str] = []
         for sym in base:
             row = snap.get(sym, {})
             ok = True
-            for cond in spec.conditions:
-                v = row.get(cond.field)
-                if v is None or not _passes(v, cond.op, cond.value):
+            for field, passes, target in compiled:
+                v = row.get(field)
+                if v is None or not passes(v, target):
                     ok = False
                     break
             if ok:
@@ -115,18 +143,20 @@ class UniverseManager:
             new_set = set(new_list)
 
             async with self._lock:
-                added = sorted(list(new_set - self._current))
-                removed = sorted(list(self._current - new_set))
-                changed = bool(added or removed)
+                # Most refreshes leave the universe unchanged; skip the sorts then
+                if new_set != self._current:
+                    current = self._current
+                    universe = sorted(new_set)
+                    added = [s for s in universe if s not in current]
+                    removed = sorted(current - new_set)
 
-                if changed:
                     self._current = new_set
-                    await self.provider.set_subscriptions(sorted(list(self._current)))
+                    await self.provider.set_subscriptions(universe)
 
                     update = UniverseUpdate(
                         added=added,
                         removed=removed,
-                        universe=sorted(list(self._current)),
+                        universe=universe,
                         reason="filter_refresh",
                         timestamp=time.time(),
                     )
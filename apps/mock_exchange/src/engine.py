@@ -1,13 +1,18 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, List, Optional
+from collections import deque
+import heapq
+import itertools
 import time
 from enum import Enum
+import msgspec
 
 class OrderSide(str, Enum):
     BUY = "BUY"
     SELL = "SELL"
 
-class Order(BaseModel):
+# msgspec Structs: cheap to build per fill, validated only when decoded from
+# JSON; gc=False since they never form reference cycles.
+class Order(msgspec.Struct, gc=False):
     id: str
     symbol: str
     qty: int
@@ -15,7 +20,7 @@ class Order(BaseModel):
     limit_price: float
     timestamp: float = 0.0
 
-class Trade(BaseModel):
+class Trade(msgspec.Struct, gc=False):
     symbol: str
     qty: int
     price: float
@@ -24,11 +29,19 @@ class Trade(BaseModel):
     sell_order_id: str
 
 class MatchingEngine:
+    # Most recent trades kept for /trades; older ones are dropped
+    TRADE_BUFFER = 100_000
+
     def __init__(self):
-        # symbol -> list[Order] (sorted by price/time)
+        # symbol -> heap of (price_key, timestamp, seq, Order); book[0] is the best
+        # resting order. price_key is -price for bids so the highest bid sorts first.
         self.bids = {} 
         self.asks = {}
-        self.trades = []
+        self.trades = deque(maxlen=self.TRADE_BUFFER)
+        # Optional callback(trade) for live consumers, called once per fill
+        self.on_trade: Optional[Callable[[Trade], None]] = None
+        # Tie-breaker so equal (price, timestamp) entries never compare Orders
+        self._seq = itertools.count()
 
     def place_order(self, order: Order) -> List[Trade]:
         order.timestamp = time.time()
@@ -44,6 +57,9 @@ class MatchingEngine:
             trades = self._match_sell(order)
             
         self.trades.extend(trades)
+        if self.on_trade is not None:
+            for trade in trades:
+                self.on_trade(trade)
         return trades
 
     def _match_buy(self, order: Order) -> List[Trade]:
@@ -51,13 +67,10 @@ class MatchingEngine:
         asks = self.asks[order.symbol]
         
         # Match against asks (lowest price first)
-        # Note: In a real LOB, asks are sorted ascending
-        asks.sort(key=lambda x: (x.limit_price, x.timestamp))
-        
         remaining_qty = order.qty
         
         while remaining_qty > 0 and asks:
-            best_ask = asks[0]
+            best_ask = asks[0][-1]
             if best_ask.limit_price > order.limit_price:
                 break # No match possible
                 
@@ -77,11 +90,11 @@ class MatchingEngine:
             best_ask.qty -= trade_qty
             
             if best_ask.qty == 0:
-                asks.pop(0)
+                heapq.heappop(asks)
                 
         if remaining_qty > 0:
             order.qty = remaining_qty
-            self.bids[order.symbol].append(order)
+            heapq.heappush(self.bids[order.symbol], (-order.limit_price, order.timestamp, next(self._seq), order))
             
         return trades
 
@@ -90,12 +103,10 @@ class MatchingEngine:
         bids = self.bids[order.symbol]
         
         # Match against bids (highest price first)
-        bids.sort(key=lambda x: (-x.limit_price, x.timestamp))
-        
         remaining_qty = order.qty
         
         while remaining_qty > 0 and bids:
-            best_bid = bids[0]
+            best_bid = bids[0][-1]
             if best_bid.limit_price < order.limit_price:
                 break
                 
@@ -115,10 +126,10 @@ class MatchingEngine:
             best_bid.qty -= trade_qty
             
             if best_bid.qty == 0:
-                bids.pop(0)
+                heapq.heappop(bids)
         
         if remaining_qty > 0:
             order.qty = remaining_qty
-            self.asks[order.symbol].append(order)
+            heapq.heappush(self.asks[order.symbol], (order.limit_price, order.timestamp, next(self._seq), order))
             
         return trades
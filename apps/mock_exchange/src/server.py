@@ -1,35 +1,51 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
 from .engine import MatchingEngine, Order
 import asyncio
+import msgspec
 import random
+import time
 
 app = FastAPI()
 engine = MatchingEngine()
 
+# Orders and trades are msgspec Structs, so they are decoded/encoded by msgspec
+# directly rather than through FastAPI's pydantic body handling.
+# strict=False keeps pydantic's leniency for clients sending e.g. "qty": "10".
+_decode_order = msgspec.json.Decoder(Order, strict=False).decode
+_encode = msgspec.json.Encoder().encode
+
+# The body is read from the raw Request, so /orders has no request-body schema
+# in the OpenAPI docs; it takes an Order as JSON.
 @app.post("/orders")
-async def create_order(order: Order):
+async def create_order(request: Request):
+    try:
+        order = _decode_order(await request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     trades = engine.place_order(order)
-    return {"status": "accepted", "fills": trades}
+    return Response(content=_encode({"status": "accepted", "fills": trades}), media_type="application/json")
 
 @app.get("/trades")
 async def get_trades():
-    return engine.trades
+    return Response(content=_encode(list(engine.trades)), media_type="application/json")
 
 @app.websocket("/ticks")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     price = 100.0
     symbol = "AAPL"
+    # Encode with msgspec but keep sending text frames, as send_json did
+    send = websocket.send_text
     try:
         while True:
             # Random Walk
             change = random.uniform(-0.5, 0.5)
             price += change
-            await websocket.send_json({
+            await send(_encode({
                 "symbol": symbol,
                 "price": round(price, 2),
-                "timestamp": asyncio.get_event_loop().time()
-            })
+                "timestamp": time.monotonic()
+            }).decode())
             await asyncio.sleep(1)
     except Exception as e:
         print(f"Connection closed: {e}")
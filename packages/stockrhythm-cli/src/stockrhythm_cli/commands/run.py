@@ -4,14 +4,18 @@ import inspect
 import json
 import sys
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import TYPE_CHECKING, List, Optional, Union
 
 import typer
-from stockrhythm import Strategy
-from stockrhythm.models import UniverseFilterSpec
 
+# The SDK (pydantic models, websockets) is imported only when a strategy is
+# actually run, so init/deploy don't pay for it at startup.
+if TYPE_CHECKING:
+    from stockrhythm import Strategy
+    from stockrhythm.models import UniverseFilterSpec
 
-FilterInput = Union[UniverseFilterSpec, List[str], None]
+
+FilterInput = Union["UniverseFilterSpec", List[str], None]
 
 
 def _load_module(file_path: Path):
@@ -39,7 +43,9 @@ def _try_call_with_paper_trade(func, paper_trade: bool):
         return func()
 
 
-def _resolve_strategy(module, paper_trade: bool) -> Strategy:
+def _resolve_strategy(module, paper_trade: bool) -> "Strategy":
+    from stockrhythm import Strategy
+
     if hasattr(module, "get_strategy") and callable(module.get_strategy):
         strategy = _try_call_with_paper_trade(module.get_strategy, paper_trade)
         if isinstance(strategy, Strategy):
@@ -67,14 +73,20 @@ def _resolve_strategy(module, paper_trade: bool) -> Strategy:
     )
 
 
-def _load_filter_from_json(path: Path) -> UniverseFilterSpec:
-    if not path.exists():
+def _load_filter_from_json(path: Path) -> "UniverseFilterSpec":
+    from stockrhythm.models import UniverseFilterSpec
+
+    # Read directly instead of stat-ing first with path.exists()
+    try:
+        data = json.loads(path.read_bytes())
+    except FileNotFoundError:
         raise typer.BadParameter(f"Filter file not found: {path}")
-    data = json.loads(path.read_text())
     return UniverseFilterSpec(**data)
 
 
 def _normalize_filter(filter_obj) -> FilterInput:
+    from stockrhythm.models import UniverseFilterSpec
+
     if filter_obj is None:
         return None
     if hasattr(filter_obj, "build") and callable(filter_obj.build):
@@ -16,11 +16,18 @@ class EngineClient:
     """
     Handles network communication with the StockRhythm Backend.
     """
-    def __init__(self, backend_url: str = "ws://localhost:8000"):
+    def __init__(self, backend_url: str = "ws://localhost:8000", wire_format: str = "json"):
+        """
+        wire_format: "json" (text frames) or "msgpack" (binary frames, needs
+        the optional msgspec dependency: pip install stockrhythm-sdk[msgpack]).
+        """
         self.backend_url = backend_url
+        self.wire_format = wire_format
         self._connected = False
         self.ws = None
         self.paper_trade = True
+        # Encoder for outbound frames after the handshake (orders)
+        self._encode = json.dumps
 
     async def connect(self, paper_trade: bool = True):
         """
@@ -55,9 +62,10 @@ class EngineClient:
             "action": "configure",
             "data": {
                 "paper_trade": self.paper_trade,
-                "protocol_version": 2,
+                "protocol_version": 3,
                 "subscribe": subscribe_symbols,
                 "filter": filter_spec,
+                "wire_format": self.wire_format,
             }
         }
 
@@ -67,15 +75,31 @@ class EngineClient:
         # I will use the new structure but also keep top-level keys if needed for safety or stick to the plan.
         # The plan says: { action: "configure", data: { paper_trade, subscribe_symbols? , filter_spec? , protocol_version } }
         
-        async with websockets.connect(self.backend_url) as websocket:
+        decode_binary = json.loads
+        encode = json.dumps
+        if self.wire_format == "msgpack":
+            import msgspec
+            decode_binary = msgspec.msgpack.Decoder().decode
+            encode = msgspec.msgpack.Encoder().encode
+
+        # Tick frames are small and frequent; per-message deflate costs more CPU
+        # than it saves on them, so don't negotiate it.
+        async with websockets.connect(self.backend_url, compression=None) as websocket:
             self.ws = websocket
             print("Connected to Backend WebSocket.")
             
             await websocket.send(json.dumps(handshake))
+            # The handshake is always JSON; once it is sent, the backend accepts
+            # binary frames in the negotiated format.
+            self._encode = encode
             
             try:
                 async for raw_message in websocket:
-                    msg = json.loads(raw_message)
+                    # Text frames are always JSON; binary frames use the negotiated format
+                    if isinstance(raw_message, str):
+                        msg = json.loads(raw_message)
+                    else:
+                        msg = decode_binary(raw_message)
                     
                     # Backward compatibility: if backend sends bare ticks or legacy format
                     if "action" not in msg:
@@ -89,11 +113,20 @@ class EngineClient:
                     if action == "tick":
                         yield Tick(**data)
 
+                    elif action == "tick_batch":
+                        # Protocol V3: backend coalesces bursts into one frame
+                        for item in data:
+                            yield Tick(**item)
+
                     elif action == "universe":
                         if on_universe_update:
                             update = UniverseUpdate(**data)
                             await on_universe_update(update)
 
+                    elif action == "lag":
+                        # Backend dropped ticks because this client fell behind
+                        print(f"Backend dropped {msg.get('dropped', 0)} ticks (client lagging)")
+
                     elif action == "error":
                         # Decide your behavior: raise or log
                         print(f"Backend Error: {data.get('message', 'Unknown backend error')}")
@@ -113,5 +146,5 @@ class EngineClient:
             "action": "order",
             "data": order.model_dump(mode='json')
         }
-        await self.ws.send(json.dumps(payload))
+        await self.ws.send(self._encode(payload))
         print(f"Order Submitted: {order.symbol} {order.side} {order.qty}")
@@ -1,3 +1,4 @@
+import json
 import importlib
 
 import pytest
@@ -58,3 +59,148 @@ class TestBackendIntegration:
                     return  # Success
 
             pytest.fail(f"Did not receive 'tick' action within {max_attempts} messages.")
+
+    def test_websocket_tick_batch_protocol_v3(self, client):
+        """
+        Integration: Protocol v3 clients receive ticks wrapped in 'tick_batch' frames.
+        """
+        with client.websocket_connect("/") as websocket:
+            websocket.send_json(
+                {
+                    "action": "configure",
+                    "data": {
+                        "paper_trade": True,
+                        "subscribe": ["TEST"],
+                        "protocol_version": 3,
+                    },
+                }
+            )
+
+            attempts = 0
+            max_attempts = 10
+            while attempts < max_attempts:
+                attempts += 1
+                data = websocket.receive_json()
+                action = data.get("action")
+                payload = data.get("data")
+
+                assert action != "tick"
+                if action == "tick_batch":
+                    assert isinstance(payload, list) and payload
+                    assert payload[0]["provider"] == "mock"
+                    return
+
+            pytest.fail(f"Did not receive 'tick_batch' action within {max_attempts} messages.")
+
+    def test_websocket_accepts_binary_json_frames(self, client):
+        """
+        Integration: A configure message sent as a binary UTF-8 JSON frame is honoured.
+        """
+        with client.websocket_connect("/") as websocket:
+            websocket.send_bytes(
+                json.dumps(
+                    {
+                        "action": "configure",
+                        "data": {"paper_trade": True, "subscribe": ["TEST"], "protocol_version": 2},
+                    }
+                ).encode()
+            )
+
+            for _ in range(10):
+                if websocket.receive_json().get("action") == "tick":
+                    return
+
+            pytest.fail("Did not receive 'tick' after a binary configure frame.")
+
+    def test_websocket_msgpack_wire_format(self, client):
+        """
+        Integration: wire_format="msgpack" switches server frames to MessagePack binary.
+        """
+        msgspec = pytest.importorskip("msgspec")
+
+        with client.websocket_connect("/") as websocket:
+            websocket.send_json(
+                {
+                    "action": "configure",
+                    "data": {
+                        "paper_trade": True,
+                        "subscribe": ["TEST"],
+                        "protocol_version": 2,
+                        "wire_format": "msgpack",
+                    },
+                }
+            )
+
+            for _ in range(10):
+                message = msgspec.msgpack.decode(websocket.receive_bytes())
+                if message.get("action") == "tick":
+                    assert message["data"]["provider"] == "mock"
+                    return
+
+            pytest.fail("Did not receive a msgpack 'tick' frame.")
+
+    def test_websocket_msgpack_inbound_order(self, client, monkeypatch, tmp_path):
+        """
+        Integration: a msgpack session may send its orders as MessagePack binary frames.
+        """
+        msgspec = pytest.importorskip("msgspec")
+        import sqlite3
+        from apps.backend.src import paper_engine
+
+        db_path = tmp_path / "paper_trades.db"
+        monkeypatch.setattr(paper_engine, "DB_PATH", str(db_path))
+
+        with client:
+            with client.websocket_connect("/") as websocket:
+                websocket.send_json(
+                    {
+                        "action": "configure",
+                        "data": {
+                            "paper_trade": True,
+                            "subscribe": ["TEST"],
+                            "protocol_version": 2,
+                            "wire_format": "msgpack",
+                        },
+                    }
+                )
+                websocket.receive_bytes()
+                websocket.send_bytes(
+                    msgspec.msgpack.encode(
+                        {
+                            "action": "order",
+                            "data": {"symbol": "RELIANCE", "qty": 3, "side": "BUY", "type": "MARKET"},
+                        }
+                    )
+                )
+                # The order is handled before the next frame is read
+                websocket.send_bytes(msgspec.msgpack.encode({"action": "noop"}))
+                websocket.receive_bytes()
+
+        conn = sqlite3.connect(str(db_path))
+        rows = conn.execute("SELECT symbol, qty FROM orders").fetchall()
+        conn.close()
+        assert rows == [("RELIANCE", 3)]
+
+    def test_websocket_invalid_order_reports_error(self, client):
+        """
+        Integration: an invalid order yields an error frame and the session keeps streaming.
+        """
+        with client.websocket_connect("/") as websocket:
+            websocket.send_json(
+                {
+                    "action": "configure",
+                    "data": {"paper_trade": True, "subscribe": ["TEST"], "protocol_version": 2},
+                }
+            )
+            websocket.send_json({"action": "order", "data": {"symbol": "RELIANCE", "qty": 1, "side": "HOLD"}})
+
+            error = None
+            for _ in range(20):
+                message = websocket.receive_json()
+                if message.get("action") == "error":
+                    error = message
+                elif error and message.get("action") == "tick":
+                    assert "Invalid order" in error["data"]["message"]
+                    return
+
+            pytest.fail("Did not receive an 'error' frame followed by more ticks.")
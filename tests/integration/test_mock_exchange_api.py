@@ -0,0 +1,31 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from apps.mock_exchange.src import server
+from apps.mock_exchange.src.engine import MatchingEngine
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "engine", MatchingEngine())
+    return TestClient(server.app)
+
+class TestMockExchangeIntegration:
+    def test_orders_accept_numeric_strings(self, client):
+        """
+        Integration: order fields are coerced like the old pydantic model did.
+        """
+        order = {"id": "s1", "symbol": "AAPL", "qty": "10", "side": "SELL", "limit_price": "100.5"}
+        response = client.post("/orders", json=order)
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "accepted", "fills": []}
+        assert server.engine.asks["AAPL"][0][-1].qty == 10
+
+    def test_orders_reject_invalid_payloads(self, client):
+        """
+        Integration: a body that can't be decoded into an Order gets a 422.
+        """
+        response = client.post("/orders", json={"id": "s1", "symbol": "AAPL", "qty": "ten", "side": "SELL"})
+
+        assert response.status_code == 422
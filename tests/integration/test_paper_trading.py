@@ -89,3 +89,41 @@ async def test_paper_trading_sqlite_persistence(monkeypatch, tmp_path):
     
     conn.close()
     print("\n✅ SQLite Paper Trading persistence verified!")
+
+
+@pytest.mark.asyncio
+async def test_paper_engine_group_commits_concurrent_orders(monkeypatch, tmp_path):
+    from stockrhythm.models import Order
+
+    db_path = tmp_path / "paper_trades.db"
+    monkeypatch.setattr(paper_engine, "DB_PATH", str(db_path))
+    engine = paper_engine.PaperEngine()
+
+    orders = [Order(symbol=f"SYM{i}", qty=i + 1, side="BUY", type="MARKET") for i in range(10)]
+    results = await asyncio.gather(*(engine.execute_order(o) for o in orders))
+    await engine.close()
+
+    order_ids = [r["order_id"] for r in results]
+    assert len(set(order_ids)) == len(orders)
+
+    conn = sqlite3.connect(str(db_path))
+    rows = dict(conn.execute("SELECT id, symbol FROM orders").fetchall())
+    fills = conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+    conn.close()
+    assert [rows[i] for i in order_ids] == [o.symbol for o in orders]
+    assert fills == len(orders)
+
+
+@pytest.mark.asyncio
+async def test_paper_engine_rejects_orders_after_close(monkeypatch, tmp_path):
+    from stockrhythm.models import Order
+
+    monkeypatch.setattr(paper_engine, "DB_PATH", str(tmp_path / "paper_trades.db"))
+    engine = paper_engine.PaperEngine()
+    order = Order(symbol="SYM", qty=1, side="BUY", type="MARKET")
+    await engine.execute_order(order)
+    await engine.close()
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(engine.execute_order(order), timeout=1.0)
+    await engine.close()
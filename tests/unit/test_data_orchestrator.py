@@ -0,0 +1,210 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from apps.backend.src.data_orchestrator import TickHub, get_provider
+from apps.backend.src.providers.base import MarketDataProvider
+from stockrhythm.models import Tick
+
+
+def make_tick(symbol: str, price: float = 1.0) -> Tick:
+    return Tick(symbol=symbol, price=price, volume=1, timestamp=datetime.now(), provider="stub")
+
+
+class StubProvider(MarketDataProvider):
+    def __init__(self):
+        self.connects = 0
+        self.subscriptions = []
+        self.ticks: asyncio.Queue = asyncio.Queue()
+
+    async def connect(self):
+        self.connects += 1
+
+    async def subscribe(self, symbols):
+        self.subscriptions.append(list(symbols))
+
+    async def stream(self):
+        while True:
+            yield await self.ticks.get()
+
+
+def test_get_provider_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        get_provider({"active_provider": "nope"})
+
+
+@pytest.mark.asyncio
+async def test_tick_hub_unions_subscriptions_across_sessions():
+    upstream = StubProvider()
+    hub = TickHub(upstream)
+    await hub.start()
+
+    a, b = hub.session(), hub.session()
+    await a.set_subscriptions(["AAA", "BBB"])
+    await b.set_subscriptions(["BBB", "CCC"])
+    await a.close()
+
+    assert upstream.connects == 1
+    assert upstream.subscriptions == [
+        ["AAA", "BBB"],
+        ["AAA", "BBB", "CCC"],
+        ["BBB", "CCC"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_tick_hub_routes_ticks_only_to_subscribed_sessions():
+    upstream = StubProvider()
+    hub = TickHub(upstream)
+    await hub.start()
+
+    a, b = hub.session(), hub.session()
+    await a.set_subscriptions(["AAA"])
+    await b.set_subscriptions(["BBB"])
+    streams = [a.stream(), b.stream()]
+    pending = [asyncio.ensure_future(s.__anext__()) for s in streams]
+    await asyncio.sleep(0)
+
+    for symbol in ("BBB", "AAA", "CCC", "BBB"):
+        upstream.ticks.put_nowait(make_tick(symbol))
+    received = await asyncio.wait_for(asyncio.gather(*pending), timeout=1.0)
+    assert [t.symbol for t in received] == ["AAA", "BBB"]
+
+    # CCC reached nobody and B's second BBB tick never reached A
+    second_b = await asyncio.wait_for(streams[1].__anext__(), timeout=1.0)
+    assert second_b.symbol == "BBB"
+    assert a._queue.empty()
+    for s in streams:
+        await s.aclose()
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_tick_hub_session_without_subscriptions_gets_no_ticks():
+    upstream = StubProvider()
+    hub = TickHub(upstream)
+    await hub.start()
+
+    subscribed, idle = hub.session(), hub.session()
+    await subscribed.set_subscriptions(["TEST"])
+    streams = [subscribed.stream(), idle.stream()]
+    pending = [asyncio.ensure_future(s.__anext__()) for s in streams]
+    await asyncio.sleep(0)
+
+    upstream.ticks.put_nowait(make_tick("TEST"))
+    tick = await asyncio.wait_for(pending[0], timeout=1.0)
+
+    assert tick.symbol == "TEST"
+    assert not pending[1].done()
+    assert idle._queue.empty()
+    pending[1].cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await pending[1]
+    for s in streams:
+        await s.aclose()
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_tick_hub_sessions_share_one_encode_per_tick():
+    upstream = StubProvider()
+    hub = TickHub(upstream)
+    await hub.start()
+
+    calls = []
+    def encode(tick):
+        calls.append(tick)
+        return f"<{tick.symbol}>"
+
+    sessions = [hub.session() for _ in range(2)]
+    for session in sessions:
+        await session.set_subscriptions(["AAA"])
+    streams = [session.frames() for session in sessions]
+    pending = [asyncio.ensure_future(s.__anext__()) for s in streams]
+    await asyncio.sleep(0)
+
+    tick = make_tick("AAA")
+    upstream.ticks.put_nowait(tick)
+    frames = await asyncio.wait_for(asyncio.gather(*pending), timeout=1.0)
+
+    assert [f.encoded(encode) for f in frames] == ["<AAA>", "<AAA>"]
+    assert calls == [tick]
+    for s in streams:
+        await s.aclose()
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_tick_hub_drops_oldest_ticks_for_slow_session():
+    upstream = StubProvider()
+    hub = TickHub(upstream, max_pending=2)
+    await hub.start()
+
+    session = hub.session()
+    await session.set_subscriptions(["AAA"])
+    stream = session.stream()
+    first = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+
+    for i in range(5):
+        upstream.ticks.put_nowait(make_tick("AAA", price=i))
+    await asyncio.sleep(0.01)
+
+    received = [await first, await stream.__anext__()]
+    assert [t.price for t in received] == [3, 4]
+    assert session.take_dropped() == 3
+    assert session.take_dropped() == 0
+    await stream.aclose()
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_tick_hub_delivers_a_batch_larger_than_max_pending():
+    class BatchProvider(StubProvider):
+        async def stream_batches(self):
+            while True:
+                yield await self.ticks.get()
+
+    upstream = BatchProvider()
+    hub = TickHub(upstream, max_pending=2)
+    await hub.start()
+
+    session = hub.session()
+    await session.set_subscriptions(["AAA"])
+    stream = session.stream()
+    first = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+
+    upstream.ticks.put_nowait([make_tick("AAA", price=i) for i in range(300)])
+    received = [await asyncio.wait_for(first, timeout=1.0)]
+    for _ in range(299):
+        received.append(await asyncio.wait_for(stream.__anext__(), timeout=1.0))
+
+    assert [t.price for t in received] == list(range(300))
+    assert session.take_dropped() == 0
+    await stream.aclose()
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_tick_hub_reuses_recent_snapshots():
+    class SnapshotProvider(StubProvider):
+        def __init__(self):
+            super().__init__()
+            self.snapshot_calls = 0
+
+        async def snapshot(self, symbols):
+            self.snapshot_calls += 1
+            return {s: {"last_price": 1.0} for s in symbols}
+
+    upstream = SnapshotProvider()
+    hub = TickHub(upstream)
+
+    a, b = hub.session(), hub.session()
+    first = await a.snapshot(["AAA", "BBB"])
+    second = await b.snapshot(["AAA", "BBB"])
+    await a.snapshot(["CCC"])
+
+    assert first == second
+    assert upstream.snapshot_calls == 2
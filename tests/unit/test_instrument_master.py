@@ -1,4 +1,8 @@
-from apps.backend.src.instrument_master import InstrumentMaster
+import threading
+import time
+
+from apps.backend.src.instrument_master import InstrumentMaster, get_instrument_master
+from apps.backend.src.universe_manager import UniverseResolver
 
 
 def test_instrument_master_load_and_resolve(tmp_path):
@@ -15,3 +19,35 @@ def test_instrument_master_load_and_resolve(tmp_path):
     assert master.resolve("RELIANCE") == "nse_cm|2885"
     assert master.resolve("tcs") == "nse_cm|11536"
     assert master.resolve("UNKNOWN") is None
+
+
+def test_instrument_master_concurrent_load_parses_once(tmp_path, monkeypatch):
+    csv_path = tmp_path / "instruments.csv"
+    csv_path.write_text(
+        "symbol,exchange,series,isin,nse_scrip_code,bse_code\n"
+        "RELIANCE,NSE,EQ,INE002A01018,2885,500325\n"
+    )
+
+    master = InstrumentMaster(csv_path=str(csv_path))
+    original = master._load_csv
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.05)
+        original()
+
+    monkeypatch.setattr(master, "_load_csv", slow_load)
+
+    threads = [threading.Thread(target=master.load) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert master.resolve("RELIANCE") == "nse_cm|2885"
+
+
+def test_default_resolvers_share_one_instrument_master():
+    assert UniverseResolver().master is UniverseResolver().master is get_instrument_master()
@@ -0,0 +1,150 @@
+import json
+
+import pytest
+
+from apps.backend.src.providers import kotak
+from apps.backend.src.providers.kotak import KotakProvider
+from apps.backend.src.providers.http_clients import aclose_shared_client, get_shared_client
+
+class TestKotakPolling:
+    def test_poll_delay_backs_off_while_prices_are_unchanged(self):
+        """
+        Scenario: LTPs stop moving, so polling escalates to the slow delays and
+        snaps back to the fast delay as soon as a price changes.
+        """
+        provider = KotakProvider(api_key="token")
+        quotes = [{"exchange_token": "2885", "ltp": "100.0"}]
+
+        delays = [provider._next_delay(quotes) for _ in range(7)]
+        assert delays[0] == kotak._POLL_ACTIVE_DELAY
+        assert delays[1:] == [0.2, 0.2, 0.5, 0.5, 1.0, 1.0]
+
+        moved = [{"exchange_token": "2885", "ltp": "100.5"}]
+        assert provider._next_delay(moved) == kotak._POLL_ACTIVE_DELAY
+        assert provider._next_delay(moved) == 0.2
+
+    def test_failed_polls_back_off_exponentially(self):
+        """
+        Scenario: consecutive failed polls double the delay (plus jitter) up to
+        the cap.
+        """
+        provider = KotakProvider(api_key="token")
+
+        delays = [provider._backoff_delay() for _ in range(10)]
+        for failures, delay in enumerate(delays, start=1):
+            floor = min(kotak._BACKOFF_MAX, kotak._BACKOFF_BASE * 2 ** failures)
+            assert floor <= delay <= floor + kotak._BACKOFF_JITTER
+        assert provider._fail_ct == 10
+
+    @pytest.mark.asyncio
+    async def test_subscribe_builds_quote_url_once(self):
+        """
+        Scenario: canonical tokens pass through, raw symbols get the legacy
+        nse_cm|<SYM>-EQ form, and the poll URL only needs base_url prepended.
+        """
+        provider = KotakProvider(api_key="token")
+        await provider.subscribe(["nse_cm|2885", "INFY"])
+
+        assert provider._query_string == "nse_cm|2885,nse_cm|INFY-EQ"
+        assert [provider.base_url + tail for tail in provider._quote_url_tails] == [
+            "https://mis.kotaksecurities.com/script-details/1.0/quotes/neosymbol/nse_cm|2885,nse_cm|INFY-EQ/all"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_subscribe_shards_large_universes(self):
+        """
+        Scenario: a universe larger than one shard is split into several quote URLs.
+        """
+        provider = KotakProvider(api_key="token")
+        symbols = [f"nse_cm|{i}" for i in range(kotak._QUOTE_SHARD_SIZE * 2 + 1)]
+        await provider.subscribe(symbols)
+
+        assert [tail.count("nse_cm|") for tail in provider._quote_url_tails] == [
+            kotak._QUOTE_SHARD_SIZE, kotak._QUOTE_SHARD_SIZE, 1
+        ]
+
+    @pytest.mark.asyncio
+    async def test_quotes_carry_the_subscribed_symbol(self, monkeypatch):
+        """
+        Scenario: quotes come back keyed by exchange_token / display_symbol; ticks
+        are labelled with the id each symbol was subscribed under.
+        """
+        quotes = [
+            {"exchange": "nse_cm", "exchange_token": "2885", "display_symbol": "RELIANCE-EQ",
+             "ltp": "100.0", "last_volume": "5"},
+            {"exchange": "nse_cm", "exchange_token": "1594", "display_symbol": "INFY-EQ",
+             "ltp": "1500.0", "last_volume": "1"},
+        ]
+
+        class QuoteResponse:
+            status_code = 200
+            content = json.dumps(quotes).encode()
+
+        class QuoteClient:
+            async def get(self, url, headers=None):
+                return QuoteResponse()
+
+        monkeypatch.setattr(kotak, "get_shared_client", lambda: QuoteClient())
+        provider = KotakProvider(api_key="token")
+        await provider.subscribe(["nse_cm|2885", "INFY"])
+
+        stream = provider.stream_batches()
+        batch = await stream.__anext__()
+        await stream.aclose()
+
+        assert [(t.symbol, t.price) for t in batch] == [("nse_cm|2885", 100.0), ("INFY", 1500.0)]
+
+    @pytest.mark.asyncio
+    async def test_quote_401_logs_in_again_at_most_once(self, monkeypatch):
+        """
+        Scenario: quotes keep coming back 401 after a re-login. The provider logs
+        in once, then only backs off instead of logging in on every poll.
+        """
+        class Stop(BaseException):
+            pass
+
+        class Unauthorized:
+            status_code = 401
+            text = "unauthorized"
+
+        class QuoteClient:
+            async def get(self, url, headers=None):
+                return Unauthorized()
+
+        logins = []
+        async def connect(self):
+            logins.append(1)
+
+        sleeps = []
+        async def sleep(delay):
+            sleeps.append(delay)
+            if len(sleeps) == 4:
+                raise Stop
+
+        monkeypatch.setattr(KotakProvider, "connect", connect)
+        monkeypatch.setattr(kotak.asyncio, "sleep", sleep)
+        monkeypatch.setattr(kotak, "get_shared_client", lambda: QuoteClient())
+        provider = KotakProvider(api_key="token")
+        await provider.subscribe(["nse_cm|2885"])
+
+        with pytest.raises(Stop):
+            async for _ in provider.stream_batches():
+                pass
+
+        assert logins == [1]
+        assert provider._fail_ct == 4
+        assert sleeps == sorted(sleeps)
+
+    @pytest.mark.asyncio
+    async def test_close_leaves_the_shared_client_open(self):
+        """
+        Scenario: one provider closing must not tear down the pool other
+        providers in the process are using.
+        """
+        client = get_shared_client()
+        await KotakProvider(api_key="token").close()
+
+        assert not client.is_closed
+        assert get_shared_client() is client
+        await aclose_shared_client()
+        assert client.is_closed
@@ -1,4 +1,5 @@
 import pytest
+from collections import deque
 import time
 from apps.mock_exchange.src.engine import MatchingEngine, Order, OrderSide
 
@@ -19,7 +20,7 @@ class TestMatchingEngine:
         
         assert len(trades) == 0
         assert len(engine.bids["AAPL"]) == 1
-        assert engine.bids["AAPL"][0].qty == 10
+        assert engine.bids["AAPL"][0][-1].qty == 10
 
     def test_match_buy_sell(self, engine):
         """
@@ -55,4 +56,38 @@ class TestMatchingEngine:
         
         assert len(trades) == 1
         assert trades[0].qty == 5
-        assert engine.asks["AAPL"][0].qty == 5
+        assert engine.asks["AAPL"][0][-1].qty == 5
+
+    def test_price_time_priority(self, engine):
+        """
+        Scenario:
+        1. Sell 5 @ 101, Sell 5 @ 100 (s2), Sell 5 @ 100 (s3)
+        2. Buy 12 @ 101
+        Result: fills s2, then s3 (same price, earlier first), then 2 of s1.
+        """
+        engine.place_order(Order(id="s1", symbol="AAPL", qty=5, side=OrderSide.SELL, limit_price=101.0))
+        engine.place_order(Order(id="s2", symbol="AAPL", qty=5, side=OrderSide.SELL, limit_price=100.0))
+        engine.place_order(Order(id="s3", symbol="AAPL", qty=5, side=OrderSide.SELL, limit_price=100.0))
+
+        trades = engine.place_order(Order(id="b1", symbol="AAPL", qty=12, side=OrderSide.BUY, limit_price=101.0))
+
+        assert [(t.sell_order_id, t.qty, t.price) for t in trades] == [
+            ("s2", 5, 100.0), ("s3", 5, 100.0), ("s1", 2, 101.0)
+        ]
+        assert engine.asks["AAPL"][0][-1].qty == 3
+
+    def test_trade_buffer_keeps_latest_and_notifies(self, engine):
+        """
+        Scenario: the trade buffer is capped, and on_trade sees every fill.
+        Result: only the newest TRADE_BUFFER trades are kept.
+        """
+        engine.trades = deque(maxlen=2)
+        seen = []
+        engine.on_trade = seen.append
+
+        for i in range(3):
+            engine.place_order(Order(id=f"s{i}", symbol="AAPL", qty=1, side=OrderSide.SELL, limit_price=100.0))
+            engine.place_order(Order(id=f"b{i}", symbol="AAPL", qty=1, side=OrderSide.BUY, limit_price=100.0))
+
+        assert [t.sell_order_id for t in seen] == ["s0", "s1", "s2"]
+        assert [t.sell_order_id for t in engine.trades] == ["s1", "s2"]
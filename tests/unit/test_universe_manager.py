@@ -76,6 +76,30 @@ async def test_universe_resolver_watchlist_resolution():
     assert master.loaded is True
 
 
+@pytest.mark.asyncio
+async def test_universe_resolver_caches_hits_and_retries_misses():
+    master = StubInstrumentMaster({"AAA": "nse_cm|111"})
+    resolver = UniverseResolver(instrument_master=master)
+    spec = UniverseFilterSpec(candidates={"type": "watchlist", "symbols": ["AAA", "BBB"]})
+
+    assert await resolver.candidates(spec) == ["nse_cm|111", "BBB"]
+    master.mapping = {"AAA": "nse_cm|999", "BBB": "nse_cm|222"}
+
+    # AAA's hit is reused; BBB's earlier miss is looked up again
+    assert await resolver.candidates(spec) == ["nse_cm|111", "nse_cm|222"]
+
+
+@pytest.mark.asyncio
+async def test_universe_resolver_cache_is_bounded(monkeypatch):
+    master = StubInstrumentMaster({f"S{i}": f"nse_cm|{i}" for i in range(5)})
+    resolver = UniverseResolver(instrument_master=master)
+    monkeypatch.setattr(UniverseResolver, "RESOLVE_CACHE_MAX", 2)
+    spec = UniverseFilterSpec(candidates={"type": "watchlist", "symbols": list(master.mapping)})
+
+    assert await resolver.candidates(spec) == [f"nse_cm|{i}" for i in range(5)]
+    assert len(resolver._resolve_cache) <= 2
+
+
 @pytest.mark.asyncio
 async def test_universe_resolver_dynamic_filters_and_max_symbols():
     master = StubInstrumentMaster({"AAA": "nse_cm|111", "BBB": "nse_cm|222", "CCC": "nse_cm|333"})